@@ -1,29 +1,78 @@
 import requests
 import os
+import io
+import sys
+import re
+import gzip
+import time
+import tempfile
+import orjson
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+from types import MappingProxyType
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
-# load the specific environment file
-load_dotenv('.env.local')
+# load the specific environment file (skipped when the key is already in the environment)
+if not os.environ.get("LEAGUE_API_KEY"):
+    load_dotenv('.env.local')
 
 API_KEY = os.getenv("LEAGUE_API_KEY")
 REGION_ROUTING = "americas"   # switch between americas / europe / asia
+MAX_CONCURRENT_REQUESTS = 20  # parallel match fetches in predict_all_players_batch
+RATE_LIMIT_PER_SECOND = 20    # Riot API per-second request limit
+REQUEST_TIMEOUT = 10          # seconds
+MATCH_CACHE_DIR = "data/.cache"
+MATCH_CACHE_TTL = None        # seconds before a cached match is refetched (None = never, finished matches don't change)
+                              # setting a TTL also bypasses the in-process memo so both cache layers expire
+PREDICT_CHUNK_ROWS = 50_000   # feature rows per thread when predicting large uploads
+
+# shared keep-alive session so repeated calls reuse the TLS connection,
+# retrying rate limits (429) and server errors with exponential backoff.
+# the pool keeps one connection per concurrent batch fetch instead of the default 10
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_maxsize=MAX_CONCURRENT_REQUESTS,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False
+    )
+))
 
 # load the trained model and preset rank labels
+MODEL_PATH = "models/vanilla_tree.sav"
 MODEL = None
+LEAF_RANK_IDS = None  # predicted rank id for every node of the tree, filled in by load_model()
+_MODEL_LOCK = threading.Lock()
 RANKS = ["Unranked", "Iron", "Bronze", "Silver", "Gold", "Platinum", 
          "Emerald", "Diamond", "Master", "Grandmaster", "Challenger"]
 
 def load_model():
-    """Load the trained model (lazy loading)"""
-    global MODEL
+    """Load the trained model (lazy loading, safe to call from multiple threads)"""
+    global MODEL, LEAF_RANK_IDS
     if MODEL is None:
-        MODEL = pickle.load(open("models/vanilla_tree.sav", "rb"))
+        with _MODEL_LOCK:
+            if MODEL is None:
+                with open(MODEL_PATH, "rb") as f:
+                    model = pickle.load(f)
+                # the tree is fixed, so resolve each node's class once instead of per prediction
+                LEAF_RANK_IDS = model.classes_.take(model.tree_.value[:, 0, :].argmax(axis=1))
+                MODEL = model
     return MODEL
 
-# encoding mappings for categorical variables (consistent with training data)
-LANE_ENCODING = {
+# encoding mappings for categorical variables (consistent with training data),
+# read-only so the tables can't drift from what the model was trained on
+LANE_ENCODING = MappingProxyType({
     'BOTTOM': 0,
     'SUPPORT': 1,  
     'NONE': 2,
@@ -31,8 +80,8 @@ LANE_ENCODING = {
     'TOP': 4,
     'MIDDLE': 5,
     'UTILITY': 1   # SUPPORT
-}
-ROLE_ENCODING = {
+})
+ROLE_ENCODING = MappingProxyType({
     'SUPPORT': 0,
     'ADC': 1,
     'NONE': 2,
@@ -42,113 +91,286 @@ ROLE_ENCODING = {
     'SOLO': 4,     # TOP
     'DUO': 1,      # ADC 
     'CARRY': 1     # ADC
-}
-GAME_PHASE_ENCODING = {
+})
+GAME_PHASE_ENCODING = MappingProxyType({
     'Mid': 0,
     'Late': 1,
     'Early': 2
+})
+
+
+def encode_column(values, encoding, default):
+    """Encode a sequence of categorical strings as int8 codes, using default for unknown values"""
+    return np.fromiter((encoding.get(value, default) for value in values), dtype=np.int8, count=len(values))
+
+# readable lane names indexed by lane code, with a trailing fallback for unknown codes
+LANE_NAMES = np.array(['BOTTOM', 'SUPPORT', 'NONE', 'JUNGLE', 'TOP', 'MIDDLE', 'UNKNOWN'], dtype=object)
+
+# column widths for the team tables printed by display_predictions
+TEAM_TABLE_WIDTHS = {
+    'Player': 20,
+    'Champion': 12,
+    'Lane': 8,
+    'KDA': 12,
+    'CS': 6,
+    'Gold': 7,
+    'Predicted Rank': 15
 }
 
+# per-player columns kept alongside the feature matrix for display and saving
+PLAYER_INFO_COLUMNS = (
+    'summonerName', 'championName', 'kills', 'deaths', 'assists',
+    'MinionsKilled', 'TotalGold', 'Win', 'KDA', 'Lane'
+)
+
+# feature columns in the order the model was trained on
+MODEL_COLUMNS = (
+    'MinionsKilled', 'DmgDealt', 'DmgTaken', 'TurretDmgDealt', 'TotalGold', 'Win',
+    'item1', 'item2', 'item3', 'item4', 'item5', 'item6',
+    'kills', 'deaths', 'assists',
+    'PrimaryKeyStone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3',
+    'SecondarySlot1', 'SecondarySlot2',
+    'SummonerSpell1', 'SummonerSpell2',
+    'CurrentMasteryPoints', 'DragonKills', 'BaronKills', 'visionScore',
+    'SummonerMatchId', 'ChampionFk', 'SummonerFk', 'GameDuration',
+    'KDA', 'GameDurationMin', 'GoldPerMin', 'CSPerMin', 'DmgPerMin', 'VisionPerMin',
+    'DmgPerGold', 'DmgEfficiency', 'ItemCount', 'ObjectiveParticipation',
+    'ChampionId', 'Lane', 'Role', 'GamePhase'
+)
+MODEL_COLUMNS_INDEX = pd.Index(MODEL_COLUMNS)
+
 
 def get_match_data(match_id):
-    """Fetch match data from Riot API"""
+    """
+    Fetch match data from Riot API, reusing the in-memory and on-disk caches.
+    
+    The returned dict is shared between callers asking for the same match,
+    so treat it as read-only (copy it before modifying).
+    """
+    # the memo has no expiry, so only the disk cache is used once a TTL is set
+    fetch = _get_match_data_cached if MATCH_CACHE_TTL is None else _get_match_data_cached.__wrapped__
+    try:
+        return fetch(match_id)
+    except LookupError:
+        return None
+
+
+@lru_cache(maxsize=512)
+def _get_match_data_cached(match_id):
+    """Memoized lookup; failed fetches raise so that they are not cached"""
+    match_data = _read_match_cache(match_id)
+    if match_data is not None:
+        return match_data
+    
+    payload = _fetch_match_payload(match_id)
+    if payload is None:
+        raise LookupError(match_id)
+    match_data = orjson.loads(payload)
+    _write_match_cache(match_id, payload)
+    return match_data
+
+
+_rate_limit_lock = threading.Lock()
+_next_request_time = 0.0
+
+
+def _wait_for_rate_limit():
+    """Space out API requests (across all threads) to stay under RATE_LIMIT_PER_SECOND"""
+    global _next_request_time
+    with _rate_limit_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + 1 / RATE_LIMIT_PER_SECOND
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _fetch_match_payload(match_id):
+    """Request match data from the Riot API, returning the raw JSON bytes"""
     match_url = f"https://{REGION_ROUTING}.api.riotgames.com/lol/match/v5/matches/{match_id}"
     
-    response = requests.get(
+    _wait_for_rate_limit()
+    response = SESSION.get(
         match_url,
-        headers={"X-Riot-Token": API_KEY}
+        headers={"X-Riot-Token": API_KEY},
+        timeout=REQUEST_TIMEOUT
     )
     
     if response.status_code == 200:
-        return response.json()
+        return response.content
     else:
         print(f"Error: {response.status_code} - {response.text}")
         return None
 
 
+def _match_cache_path(match_id):
+    """Path of the cached JSON for a match, or None if the ID is not safe to use as a filename"""
+    if not isinstance(match_id, str) or not re.fullmatch(r"[A-Za-z0-9_-]+", match_id):
+        return None
+    return os.path.join(MATCH_CACHE_DIR, f"{match_id}.json.gz")
+
+
+def _read_match_cache(match_id):
+    """Load a cached match from disk if present and not older than MATCH_CACHE_TTL"""
+    path = _match_cache_path(match_id)
+    if path is None or not os.path.exists(path):
+        return None
+    if MATCH_CACHE_TTL is not None and time.time() - os.path.getmtime(path) > MATCH_CACHE_TTL:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(gzip.decompress(f.read()))
+    except (OSError, EOFError, ValueError):  # unreadable, truncated or corrupt: refetch
+        return None
+
+
+def _write_match_cache(match_id, payload):
+    """Store the raw match JSON on disk (written to a temp file first so readers never see partial files)"""
+    path = _match_cache_path(match_id)
+    if path is None:
+        return
+    tmp_path = None
+    # best effort: an unwritable cache dir (read-only deploy, other cwd) must not fail the fetch
+    try:
+        os.makedirs(MATCH_CACHE_DIR, exist_ok=True)
+        # unique temp file per write, so threads caching the same match never share one
+        fd, tmp_path = tempfile.mkstemp(dir=MATCH_CACHE_DIR, prefix=f"{match_id}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(payload))
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+_get_items = itemgetter('item0', 'item1', 'item2', 'item3', 'item4', 'item5')
+_get_perk = itemgetter('perk')
+PERK_COLUMNS = ('PrimaryKeyStone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3', 'SecondarySlot1', 'SecondarySlot2')
+
+
+def _get_perks(participant):
+    """Rune ids in PERK_COLUMNS order, walking the nested perks payload once"""
+    primary, secondary = participant['perks']['styles'][:2]
+    return (*map(_get_perk, primary['selections'][:4]), *map(_get_perk, secondary['selections'][:2]))
+
+
 def extract_player_stats(match_data, username=None):
     """
     Extract player statistics from Riot API match data and format for the ML model.
     
     Args:
         match_data: Match data from Riot API
-        username: (Optional) Summoner name to filter for. If None, returns all players.
+        username: (Optional) Summoner name to return (first match). If None, returns all players.
     
     Returns:
         DataFrame with player statistics formatted for the ML model
     """
+    columns = _extract_columns(match_data, username)
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(columns['summonerName'])))
+
+
+def extract_player_features(match_data, username=None):
+    """
+    Extract the model's feature matrix plus a small player-info frame, without
+    building the full player stats DataFrame.
     
+    Args:
+        match_data: Match data from Riot API
+        username: (Optional) Summoner name to return (first match). If None, returns all players.
+    
+    Returns:
+        Tuple of (float32 array with columns in MODEL_COLUMNS order,
+                  DataFrame with the PLAYER_INFO_COLUMNS used for display and saving)
+    """
+    columns = _extract_columns(match_data, username)
+    
+    # fill a preallocated C-ordered float32 matrix column by column (each column cast once)
+    features = np.empty((len(columns['summonerName']), len(MODEL_COLUMNS)), dtype=np.float32, order='C')
+    for i, col in enumerate(MODEL_COLUMNS):
+        features[:, i] = columns[col]
+    
+    players_df = pd.DataFrame({col: columns[col] for col in PLAYER_INFO_COLUMNS},
+                              index=pd.RangeIndex(len(features)))
+    return features, players_df
+
+
+def _extract_columns(match_data, username=None):
+    """Build the player stats as a {column: array} mapping (shared by the two extract functions)"""
     participants = match_data['info']['participants']
+    if username:
+        # pick the player before extracting so only their columns are built,
+        # and stop scanning the lobby at the first match
+        target_name = username.lower()
+        player = next((p for p in participants if p['riotIdGameName'].lower() == target_name), None)
+        participants = [] if player is None else [player]
     game_duration_seconds = match_data['info']['gameDuration']
     game_duration_min = game_duration_seconds / 60
+    n_players = len(participants)
+    game_phase_code = GAME_PHASE_ENCODING['Early' if game_duration_min < 20 else ('Mid' if game_duration_min < 35 else 'Late')]
+    
+    def _column(values, dtype=np.int64):
+        return np.fromiter(values, dtype=dtype, count=n_players)
+    
+    # (n_players, 6) item ids, feeds both the item1..item6 columns and ItemCount
+    items = np.array([_get_items(p) for p in participants], dtype=np.int64).reshape(n_players, 6)
+    perks = np.array([_get_perks(p) for p in participants], dtype=np.int64).reshape(n_players, len(PERK_COLUMNS))
+    
+    # build each column in one pass over the participants instead of a dict per player
+    columns = {
+        'MinionsKilled': _column(p['totalMinionsKilled'] for p in participants),
+        'DmgDealt': _column(p['totalDamageDealtToChampions'] for p in participants),
+        'DmgTaken': _column(p['totalDamageTaken'] for p in participants),
+        'TurretDmgDealt': _column(p['damageDealtToTurrets'] for p in participants),
+        'TotalGold': _column(p['goldEarned'] for p in participants),
+        'Win': _column(1 if p['win'] else 0 for p in participants),
+        **{f'item{i + 1}': items[:, i] for i in range(6)},
+        'kills': _column(p['kills'] for p in participants),
+        'deaths': _column(p['deaths'] for p in participants),
+        'assists': _column(p['assists'] for p in participants),
+        **{col: perks[:, i] for i, col in enumerate(PERK_COLUMNS)},
+        'SummonerSpell1': _column(p['summoner1Id'] for p in participants),
+        'SummonerSpell2': _column(p['summoner2Id'] for p in participants),
+        'CurrentMasteryPoints': _column(p.get('championPoints', 0) for p in participants),
+        'DragonKills': _column(p.get('dragonKills', 0) for p in participants),
+        'BaronKills': _column(p.get('baronKills', 0) for p in participants),
+        'visionScore': _column(p['visionScore'] for p in participants),
+        'SummonerMatchId': np.zeros(n_players, dtype=np.int64),
+        'ChampionFk': _column(p['championId'] for p in participants),
+        'SummonerFk': np.zeros(n_players, dtype=np.int64),
+        'GameDuration': np.full(n_players, game_duration_seconds, dtype=np.int64),
+    }
     
-    player_stats_list = []
-    
-    for participant in participants:
-        if username and participant['riotIdGameName'].lower() != username.lower():
-            continue
-        stats = {
-            'MinionsKilled': participant['totalMinionsKilled'],
-            'DmgDealt': participant['totalDamageDealtToChampions'],
-            'DmgTaken': participant['totalDamageTaken'],
-            'TurretDmgDealt': participant['damageDealtToTurrets'],
-            'TotalGold': participant['goldEarned'],
-            'Win': 1 if participant['win'] else 0,
-            'item1': participant['item0'],
-            'item2': participant['item1'],
-            'item3': participant['item2'],
-            'item4': participant['item3'],
-            'item5': participant['item4'],
-            'item6': participant['item5'],
-            'kills': participant['kills'],
-            'deaths': participant['deaths'],
-            'assists': participant['assists'],
-            'PrimaryKeyStone': participant['perks']['styles'][0]['selections'][0]['perk'],
-            'PrimarySlot1': participant['perks']['styles'][0]['selections'][1]['perk'],
-            'PrimarySlot2': participant['perks']['styles'][0]['selections'][2]['perk'],
-            'PrimarySlot3': participant['perks']['styles'][0]['selections'][3]['perk'],
-            'SecondarySlot1': participant['perks']['styles'][1]['selections'][0]['perk'],
-            'SecondarySlot2': participant['perks']['styles'][1]['selections'][1]['perk'],
-            'SummonerSpell1': participant['summoner1Id'],
-            'SummonerSpell2': participant['summoner2Id'],
-            'CurrentMasteryPoints': participant.get('championPoints', 0),
-            'DragonKills': participant.get('dragonKills', 0),
-            'BaronKills': participant.get('baronKills', 0),
-            'visionScore': participant['visionScore'],
-            'SummonerMatchId': 0,
-            'ChampionFk': participant['championId'],
-            'SummonerFk': 0,
-            'GameDuration': game_duration_seconds,
-            
-            # features engineered from the data analysis ipynb, need to do manually here
-            'KDA': (participant['kills'] + participant['assists']) / max(participant['deaths'], 1),
-            'GameDurationMin': game_duration_min,
-            'GoldPerMin': participant['goldEarned'] / game_duration_min,
-            'CSPerMin': participant['totalMinionsKilled'] / game_duration_min,
-            'DmgPerMin': participant['totalDamageDealtToChampions'] / game_duration_min,
-            'VisionPerMin': participant['visionScore'] / game_duration_min,
-            'DmgPerGold': participant['totalDamageDealtToChampions'] / max(participant['goldEarned'], 1),
-            'DmgEfficiency': participant['totalDamageDealtToChampions'] / max(participant['totalDamageTaken'], 1),
-            'ItemCount': sum([1 for i in range(6) if participant[f'item{i}'] != 0]),
-            'ObjectiveParticipation': participant.get('dragonKills', 0) + participant.get('baronKills', 0),
-            
-            'ChampionId': participant['championId'],
-            'Lane': participant['lane'],
-            'Role': participant['role'],
-            'GamePhase': 'Early' if game_duration_min < 20 else ('Mid' if game_duration_min < 35 else 'Late'),
-            'summonerName': participant['riotIdGameName'],
-            'championName': participant['championName'],
-        }
+    # features engineered from the data analysis ipynb, need to do manually here
+    kills, deaths, assists = columns['kills'], columns['deaths'], columns['assists']
+    gold, dmg_dealt, dmg_taken = columns['TotalGold'], columns['DmgDealt'], columns['DmgTaken']
+    # denominators floored at 1 to avoid dividing by zero
+    deaths_safe = np.maximum(deaths, 1)
+    gold_safe = np.maximum(gold, 1)
+    dmg_taken_safe = np.maximum(dmg_taken, 1)
+    columns.update({
+        'KDA': (kills + assists) / deaths_safe,
+        'GameDurationMin': np.full(n_players, game_duration_min),
+        'GoldPerMin': gold / game_duration_min,
+        'CSPerMin': columns['MinionsKilled'] / game_duration_min,
+        'DmgPerMin': dmg_dealt / game_duration_min,
+        'VisionPerMin': columns['visionScore'] / game_duration_min,
+        'DmgPerGold': dmg_dealt / gold_safe,
+        'DmgEfficiency': dmg_dealt / dmg_taken_safe,
+        'ItemCount': (items != 0).sum(axis=1, dtype=np.int8),
+        'ObjectiveParticipation': columns['DragonKills'] + columns['BaronKills'],
         
-        player_stats_list.append(stats)
-    
-    df = pd.DataFrame(player_stats_list)
-    
-    #fill null vals
-    df['Lane'] = df['Lane'].map(LANE_ENCODING).fillna(5)
-    df['Role'] = df['Role'].map(ROLE_ENCODING).fillna(1)
-    df['GamePhase'] = df['GamePhase'].map(GAME_PHASE_ENCODING).fillna(0)
-    return df
+        'ChampionId': columns['ChampionFk'],
+        'Lane': encode_column([p['lane'] for p in participants], LANE_ENCODING, 5),
+        'Role': encode_column([p['role'] for p in participants], ROLE_ENCODING, 1),
+        'GamePhase': np.full(n_players, game_phase_code, dtype=np.int8),
+        'summonerName': [p['riotIdGameName'] for p in participants],
+        'championName': [p['championName'] for p in participants],
+    })
+    
+    return columns
 
 
 def prepare_for_model(df):
@@ -160,48 +382,104 @@ def prepare_for_model(df):
         df: DataFrame from extract_player_stats()
     
     Returns:
-        DataFrame ready for model.predict()
-    """
-    model_columns = [
-        'MinionsKilled', 'DmgDealt', 'DmgTaken', 'TurretDmgDealt', 'TotalGold', 'Win',
-        'item1', 'item2', 'item3', 'item4', 'item5', 'item6',
-        'kills', 'deaths', 'assists',
-        'PrimaryKeyStone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3',
-        'SecondarySlot1', 'SecondarySlot2',
-        'SummonerSpell1', 'SummonerSpell2',
-        'CurrentMasteryPoints', 'DragonKills', 'BaronKills', 'visionScore',
-        'SummonerMatchId', 'ChampionFk', 'SummonerFk', 'GameDuration',
-        'KDA', 'GameDurationMin', 'GoldPerMin', 'CSPerMin', 'DmgPerMin', 'VisionPerMin',
-        'DmgPerGold', 'DmgEfficiency', 'ItemCount', 'ObjectiveParticipation',
-        'ChampionId', 'Lane', 'Role', 'GamePhase'
-    ]
+        DataFrame ready for model.predict() (a column selection of df, meant to be read only)
+    """
+    return df[MODEL_COLUMNS_INDEX]
+
+
+def prepare_for_model_array(df):
+    """
+    Build the model's feature matrix directly as a C-contiguous float32 array.
+    The tree compares features as float32 internally, so this is the only cast needed.
+    
+    Args:
+        df: DataFrame from extract_player_stats()
     
-    return df[model_columns].copy()
+    Returns:
+        np.ndarray of shape (n_players, len(MODEL_COLUMNS))
+    """
+    return np.ascontiguousarray(df[MODEL_COLUMNS_INDEX].to_numpy(dtype=np.float32))
 
 
-def add_rank_predictions(players_df):
+def predict_rank_ids(features):
+    """
+    Predict rank ids for a feature matrix from prepare_for_model_array().
+    
+    Goes straight to the fitted tree, skipping sklearn's input validation
+    (another copy of the array, plus a feature-name warning for ndarrays),
+    and maps the reached leaves through the precomputed LEAF_RANK_IDS
+    instead of building class probabilities and taking their argmax.
+    Only the shape is checked here, since the tree does no bounds checking.
+    
+    Args:
+        features: 2D array with columns in MODEL_COLUMNS order (cast to float32 if needed)
+    
+    Returns:
+        np.ndarray of rank ids (indices into RANKS)
+    
+    Raises:
+        ValueError: If features is not 2D with one column per model feature
+    """
+    model = load_model()
+    features = np.asarray(features)
+    if features.ndim != 2 or features.shape[1] != model.n_features_in_:
+        raise ValueError(
+            f"Expected a 2D feature array with {model.n_features_in_} columns, got shape {features.shape}"
+        )
+    # no-op for prepare_for_model_array() output
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    n_chunks = min(os.cpu_count() or 1, -(-len(features) // PREDICT_CHUNK_ROWS))
+    if n_chunks <= 1:
+        return LEAF_RANK_IDS[model.tree_.apply(features)]
+    
+    # tree traversal releases the GIL, so big inputs are split across threads
+    with ThreadPoolExecutor(max_workers=n_chunks) as pool:
+        leaves = np.concatenate(list(pool.map(model.tree_.apply, np.array_split(features, n_chunks))))
+    return LEAF_RANK_IDS[leaves]
+
+
+def add_rank_predictions(players_df, features=None):
     """
     Attach model rank predictions to a player stats DataFrame.
     
     Args:
-        players_df: Output of extract_player_stats()
+        players_df: Output of extract_player_stats() (or the player info from extract_player_features())
+        features: (Optional) Feature matrix for the same players; built from players_df if omitted
     
     Returns:
-        DataFrame with PredictedRank and PredictedRankId columns
+        DataFrame with an ordered categorical PredictedRank column (its .cat.codes are the rank ids)
     """
     if players_df is None or players_df.empty:
         return None
     
-    model_features = prepare_for_model(players_df)
-    model = load_model()
-    predictions = model.predict(model_features)
+    if features is None:
+        features = prepare_for_model_array(players_df)
+    elif len(features) != len(players_df):
+        raise ValueError(f"Got {len(features)} feature rows for {len(players_df)} players")
+    predictions = predict_rank_ids(features)
     
     with_predictions = players_df.copy()
-    with_predictions['PredictedRankId'] = predictions
-    with_predictions['PredictedRank'] = [RANKS[int(pred)] for pred in predictions]
+    # rank ids are the codes of an ordered categorical over RANKS, so no per-player label lookup
+    with_predictions['PredictedRank'] = pd.Categorical.from_codes(predictions, categories=RANKS, ordered=True)
     return with_predictions
 
 
+def _rank_ids_from_labels(ranks):
+    """
+    Rank ids (indices into RANKS) for a PredictedRank column.
+    
+    Works for the ordered categorical from add_rank_predictions() as well as
+    plain rank names (e.g. older outputs or a saved predictions file read back in).
+    
+    Raises:
+        ValueError: If a value is not one of RANKS
+    """
+    codes = pd.Categorical(ranks, categories=RANKS, ordered=True).codes
+    if (codes < 0).any():
+        raise ValueError(f"PredictedRank must only contain rank names from {RANKS}")
+    return codes
+
+
 def get_player_stats_from_match(match_id, username):
     """
     Fetch a specific player's stats from a match.
@@ -234,19 +512,73 @@ def predict_all_players(match_id):
         match_id: The match ID (e.g., "NA1_5404818015")
     
     Returns:
-        DataFrame with player info and predictions
+        DataFrame with player info (PLAYER_INFO_COLUMNS) and predictions
     """
     match_data = get_match_data(match_id)
     
     if not match_data:
         return None
     
-    all_players = extract_player_stats(match_data)
+    features, all_players = extract_player_features(match_data)
     
     if all_players.empty:
         return None
     
-    return add_rank_predictions(all_players)
+    return add_rank_predictions(all_players, features)
+
+
+def fetch_matches(match_ids):
+    """
+    Fetch several matches concurrently over the shared session.
+    
+    Args:
+        match_ids: Iterable of match IDs
+    
+    Returns:
+        List of match data (None for failed fetches), in the same order as match_ids
+    """
+    match_ids = list(match_ids)
+    if not match_ids:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(match_ids))) as pool:
+        return list(pool.map(get_match_data, match_ids))
+
+
+def predict_all_players_batch(match_ids):
+    """
+    Predict ranks for all players in several matches, fetching the matches concurrently
+    and scoring every player with a single predict_rank_ids call.
+    
+    Args:
+        match_ids: Iterable of match IDs
+    
+    Returns:
+        Dictionary mapping each match ID to its predictions DataFrame (None on failure)
+    """
+    results = dict.fromkeys(match_ids)
+    
+    match_players = {}
+    match_features = []
+    for match_id, match_data in zip(results, fetch_matches(results)):
+        if not match_data:
+            continue
+        features, players_df = extract_player_features(match_data)
+        if not players_df.empty:
+            match_players[match_id] = players_df
+            match_features.append(features)
+    
+    if not match_players:
+        return results
+    
+    # predict on all matches at once, then split the rows back out by match ID
+    all_players = add_rank_predictions(
+        pd.concat(match_players, names=['MatchId', None]),
+        np.concatenate(match_features)
+    )
+    for match_id in match_players:
+        results[match_id] = all_players.loc[match_id]
+    return results
 
 
 def prepare_prediction_summary(players_df):
@@ -265,13 +597,16 @@ def prepare_prediction_summary(players_df):
     if 'PredictedRank' not in players_df.columns:
         raise ValueError("Players DataFrame must include predictions. Call add_rank_predictions first.")
     
-    summary_df = players_df.copy()
-    summary_df['LaneName'] = summary_df['Lane'].apply(get_lane_name)
-    summary_df['KDAString'] = summary_df.apply(
-        lambda row: f"{row['kills']}/{row['deaths']}/{row['assists']}", axis=1
+    summary_df = players_df.assign(
+        LaneName=get_lane_names(players_df['Lane']),
+        KDAString=(
+            players_df['kills'].astype(str) + '/' +
+            players_df['deaths'].astype(str) + '/' +
+            players_df['assists'].astype(str)
+        ),
+        CS=players_df['MinionsKilled'].astype(int),
+        GoldDisplay=(players_df['TotalGold'] / 1000).map('{:.1f}k'.format)
     )
-    summary_df['CS'] = summary_df['MinionsKilled'].astype(int)
-    summary_df['GoldDisplay'] = summary_df['TotalGold'].apply(lambda gold: f"{gold / 1000:.1f}k")
     
     display_cols = [
         'summonerName', 'championName', 'LaneName', 'KDAString',
@@ -287,19 +622,19 @@ def prepare_prediction_summary(players_df):
         'PredictedRank': 'Predicted Rank'
     }
     
-    blue_team = summary_df[summary_df['Win'] == 0][display_cols].rename(columns=rename_map).reset_index(drop=True)
-    red_team = summary_df[summary_df['Win'] == 1][display_cols].rename(columns=rename_map).reset_index(drop=True)
+    # select/rename the display columns once, then split on a single pass over Win
+    team_table = summary_df[display_cols].rename(columns=rename_map)
+    won = summary_df['Win'].to_numpy(dtype=bool)
+    blue_team = team_table[~won].reset_index(drop=True)
+    red_team = team_table[won].reset_index(drop=True)
     
-    rank_counts_series = summary_df['PredictedRank'].value_counts()
-    rank_counts = {
-        rank: int(rank_counts_series.get(rank, 0))
-        for rank in RANKS
-        if rank_counts_series.get(rank, 0)
-    }
+    # count straight off the integer ids; bincount comes back in RANKS order
+    rank_ids = _rank_ids_from_labels(summary_df['PredictedRank'])
+    counts = np.bincount(rank_ids, minlength=len(RANKS))
+    rank_counts = {RANKS[i]: int(counts[i]) for i in np.flatnonzero(counts)}
     
-    avg_rank_id = float(summary_df['PredictedRankId'].mean())
-    avg_rank_id_for_label = max(0, min(len(RANKS) - 1, round(avg_rank_id)))
-    avg_rank = RANKS[int(avg_rank_id_for_label)]
+    avg_rank_id = float(rank_ids.mean())
+    avg_rank = RANKS[int(np.clip(np.rint(avg_rank_id), 0, len(RANKS) - 1))]
     
     return {
         'blue_team': blue_team,
@@ -341,48 +676,67 @@ def display_predictions(players_df):
     if summary is None:
         return
     
-    print("Player Rank Predictions:")
+    # build the whole report in memory and write it out once
+    buf = io.StringIO()
+    w = buf.write
+    w("Player Rank Predictions:\n")
     
-    def _print_team(label, team_df):
-        print(f"\n{label}")
-        print(f"{'Player':<20} {'Champion':<12} {'Lane':<8} {'KDA':<12} {'CS':<6} {'Gold':<7} {'Predicted Rank':<15}")
-        for _, row in team_df.iterrows():
-            print(f"{row['Player']:<20} {row['Champion']:<12} {row['Lane']:<8} "
-                  f"{row['KDA']:<12} {row['CS']:<6} {row['Gold']:<7} {row['Predicted Rank']:<15}")
+    def _write_team(label, team_df):
+        w(f"\n{label}\n")
+        w(" ".join(f"{col:<{width}}" for col, width in TEAM_TABLE_WIDTHS.items()) + "\n")
+        if team_df.empty:
+            return
+        # pad whole columns at once rather than formatting row by row
+        padded = [team_df[col].astype(str).str.ljust(width) for col, width in TEAM_TABLE_WIDTHS.items()]
+        w("\n".join(padded[0].str.cat(padded[1:], sep=" ")) + "\n")
     
-    _print_team("BLUE TEAM (set to losing team)", summary['blue_team'])
-    _print_team("RED TEAM (set to winning team)", summary['red_team'])
+    _write_team("BLUE TEAM (set to losing team)", summary['blue_team'])
+    _write_team("RED TEAM (set to winning team)", summary['red_team'])
     
-    print("\nRank distribution:")
+    w("\nRank distribution:\n")
     for rank, count in summary['rank_counts'].items():
-        print(f"  {rank}: {count} player(s)")
+        w(f"  {rank}: {count} player(s)\n")
     
-    print(f"\n  Average Rank: {summary['average_rank']} (≈{summary['average_rank_id']:.2f})")
+    w(f"\n  Average Rank: {summary['average_rank']} (≈{summary['average_rank_id']:.2f})\n")
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
 
+def get_lane_names(lane_codes):
+    """Convert a column of lane codes back to readable names ('UNKNOWN' for unmapped codes)"""
+    codes = np.asarray(lane_codes, dtype=np.int64)
+    known = (codes >= 0) & (codes < len(LANE_NAMES) - 1)
+    return LANE_NAMES[np.where(known, codes, len(LANE_NAMES) - 1)]
 
-def get_lane_name(lane_code):
-    """Convert lane code back to readable name"""
-    lane_map = {0: 'BOTTOM', 1: 'SUPPORT', 2: 'NONE', 3: 'JUNGLE', 4: 'TOP', 5: 'MIDDLE'}
-    return lane_map.get(int(lane_code), 'UNKNOWN')
 
-
-def save_predictions(players_df, filename='match_predictions.csv'):
+def save_predictions(players_df, filename='match_predictions.parquet', fmt=None):
     """
-    Save predictions to CSV file.
+    Save predictions to a Parquet file (zstd compressed), or to CSV if filename ends in '.csv'.
+    Parquet keeps the column dtypes; the CSV may read KDA back as int if every value is whole.
     
     Args:
         players_df: DataFrame with player stats and predictions
-        filename: Output filename (default: 'match_predictions.csv')
+        filename: Output filename (default: 'match_predictions.parquet')
+        fmt: 'parquet' or 'csv' to override the format implied by the filename
     """
     if players_df is None or players_df.empty:
         return
     
+    if fmt is None:
+        fmt = 'csv' if filename.endswith('.csv') else 'parquet'
+    if fmt not in ('parquet', 'csv'):
+        raise ValueError(f"Unsupported format: {fmt!r} (expected 'parquet' or 'csv')")
+    
     output_df = players_df[[
         'summonerName', 'championName', 'kills', 'deaths', 'assists',
-        'MinionsKilled', 'TotalGold', 'Win', 'KDA', 'PredictedRank', 'PredictedRankId'
-    ]].copy()
+        'MinionsKilled', 'TotalGold', 'Win', 'KDA', 'PredictedRank'
+    ]].assign(PredictedRankId=_rank_ids_from_labels(players_df['PredictedRank']))
     
-    output_df.to_csv(filename, index=False)
+    if fmt == 'csv':
+        # arrow's C++ CSV writer instead of pandas' per-cell to_csv formatting.
+        # whole-number floats are written without '.0' (KDA 2.0 -> 2); use parquet when dtypes matter
+        pa_csv.write_csv(pa.Table.from_pandas(output_df, preserve_index=False), filename)
+    else:
+        output_df.to_parquet(filename, engine='pyarrow', compression='zstd', index=False)
     print(f"\n Predictions saved at: {filename}")
 
 
@@ -396,6 +750,6 @@ if __name__ == "__main__":
     
     if results is not None:
         display_predictions(results)
-        save_predictions(results, 'data/match_predictions.csv')
+        save_predictions(results, 'data/match_predictions.parquet')
     else:
         print("Failed to fetch or process data")
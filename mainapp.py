@@ -1,10 +1,9 @@
 #imports 
 import streamlit as st
 import pandas as pd
-import pickle 
+import numpy as np
 from sklearn.tree import DecisionTreeClassifier
-from collections import Counter
-from league_api import get_match_prediction_summary
+from league_api import get_match_prediction_summary, prepare_for_model_array, predict_rank_ids, MODEL_COLUMNS, RANKS
 
 # Set page configuration
 st.set_page_config(layout="wide", page_title="COMP 560 Final App")
@@ -18,17 +17,23 @@ st.sidebar.markdown("""
     Data inputted into the application must have the same column names as the csv file downloadable below.
 """)
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_cached_match_summary(match_id):
+    #failed lookups raise so they aren't cached and are retried on the next click
+    summary = get_match_prediction_summary(match_id)
+    if summary is None:
+        raise LookupError(match_id)
+    return summary
+
 @st.cache_data
-def convert_for_download(df):
-    return df.to_csv().encode("utf-8")
+def get_example_csv_bytes(path):
+    #read and encode in one cached step, keyed on the path rather than on a hashed DataFrame
+    return pd.read_csv(path).to_csv().encode("utf-8")
 
 #example data is from diamond rank games
-exampledf = pd.read_csv("data/example.csv")
-csv = convert_for_download(exampledf)
-
 st.sidebar.download_button(
     label="Download Example CSV",
-    data=csv,
+    data=get_example_csv_bytes("data/example.csv"),
     file_name="data.csv",
     mime="text/csv",
     icon=":material/download:",
@@ -50,42 +55,57 @@ st.header("Predicting Ranks Based on Uploaded Game Stats!")
 
 my_upload = st.file_uploader("Upload Your League Game Stats Here", type=['csv','xlsx'],accept_multiple_files=False,key="fileUploader")
 statsdf = None
+features = None
 if my_upload is not None: 
-    try:
-        statsdf = pd.read_csv(my_upload)
-        statsdf = statsdf.drop(columns=["Unnamed: 0"], axis=1)
-    except:
+    #parse each upload once; button clicks rerun the script but reuse the stored frame and float32 features
+    stored = st.session_state.get("uploadedStats")
+    if stored is not None and stored[0] == my_upload.file_id:
+        _, statsdf, features = stored
+    else:
+        #only parse the model's feature columns (skips the saved index and any extra columns), in training order
+        #missing columns raise KeyError (csv) or ValueError (excel), malformed files a ParserError
         try:
-            statsdf = pd.read_excel(my_upload)
-            statsdf = statsdf.drop(columns=["Unnamed: 0"], axis=1)
-        except:
-            pass
+            if my_upload.name.lower().endswith(".xlsx"):
+                statsdf = pd.read_excel(my_upload, usecols=list(MODEL_COLUMNS))[list(MODEL_COLUMNS)]
+            else:
+                statsdf = pd.read_csv(my_upload, usecols=MODEL_COLUMNS, engine="pyarrow")[list(MODEL_COLUMNS)]
+        except (pd.errors.ParserError, ValueError, KeyError) as e:
+            st.error(f"Could not read the uploaded file. Make sure it has the same columns as the example CSV. ({e})")
+        else:
+            if statsdf.empty:
+                #a header-only file would otherwise report a made-up "Unranked" prediction
+                st.warning("The uploaded file has no games in it. Add at least one row of stats to get a prediction.")
+                statsdf = None
+            else:
+                #float32 contiguous features, predicted with the same model instance as the match predictions
+                try:
+                    features = prepare_for_model_array(statsdf)
+                except ValueError as e:
+                    #text columns (e.g. Lane="TOP") must be numerically encoded like the example CSV
+                    st.error(f"Every stat column must be numeric, like in the example CSV. ({e})")
+                else:
+                    st.session_state["uploadedStats"] = (my_upload.file_id, statsdf, features)
 
 if statsdf is not None: 
-    st.dataframe(data=statsdf)
-
-vanilla_decision_tree = pickle.load(open("models/vanilla_tree.sav", "rb"))
-ranks = ["Unranked","Iron", "Bronze", "Silver", "Gold", "Platinum", "Emerald", "Diamond", "Master", "Grandmaster", "Challenger"]
-
+    #only send a preview to the browser, large uploads are still predicted in full
+    if len(statsdf) > 200:
+        st.caption(f"Showing the first 200 of {len(statsdf)} games")
+    st.dataframe(data=statsdf.head(200), width="stretch")
 
-if st.button("Predict your rank", width="stretch") and statsdf is not None:
-    predictions = list(vanilla_decision_tree.predict(statsdf))
-    predictions = [ranks[x] for x in predictions]
-    counted_predictions = Counter(predictions)
+if st.button("Predict your rank", width="stretch") and features is not None:
+    rank_ids = predict_rank_ids(features)
     
-    #get max 
-    keys = list(counted_predictions.keys())
-    maxkey = keys[0]
-    for key in keys:
-        if counted_predictions[maxkey] < counted_predictions[key]:
-            maxkey = key
+    #most common predicted rank, counted on the integer ids (ties go to the lower rank)
+    maxkey = RANKS[np.bincount(rank_ids, minlength=len(RANKS)).argmax()]
     
     st.header("Rank Prediction!")
-    gamepredictiondf = pd.DataFrame()
-    gamepredictiondf["Game Number"] = range(0, len(predictions))
-    gamepredictiondf["Rank Predictions"] = predictions
+    gamepredictiondf = pd.DataFrame({
+        "Game Number": np.arange(len(rank_ids)),
+        #ordered categorical: int8 codes plus one table of rank names
+        "Rank Predictions": pd.Categorical.from_codes(rank_ids, categories=RANKS, ordered=True)
+    })
 
-    st.dataframe(data=gamepredictiondf)
+    st.dataframe(data=gamepredictiondf, width="stretch", hide_index=True)
     st.metric("Average Predicted Rank", maxkey)
 
 "________________________________"
@@ -101,7 +121,11 @@ if match_predict_btn:
         st.warning("Please enter a valid match ID before requesting predictions.")
     else:
         with st.spinner("Fetching match data and generating predictions..."):
-            summary = get_match_prediction_summary(match_id_input)
+            try:
+                #match IDs are case-insensitive, so normalize before using it as the cache key
+                summary = get_cached_match_summary(match_id_input.upper())
+            except LookupError:
+                summary = None
         if summary is None:
             st.error("Unable to retrieve match data or predictions. Double-check the match ID and ensure the API key is configured.")
         else: